@@ -13,6 +13,7 @@ Security Classifications:
 """
 
 import subprocess
+import asyncio
 import requests
 import time
 import json
@@ -21,31 +22,136 @@ import threading
 import logging
 import signal
 import sys
+import types
 import os
-import argparse
+import re
+import importlib.util
+import shutil
+import shlex
+import concurrent.futures
+from collections import deque
 from contextlib import contextmanager
 import socket
+import select
+import errno
+import ipaddress
+from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
 
 # Handle optional dependencies
-try:
-    from stem import Signal
-    from stem.control import Controller
-    STEM_AVAILABLE = True
-except ImportError:
-    STEM_AVAILABLE = False
-    print("Warning: stem library not available. Install with: pip install stem")
-
-try:
-    import socks
-    SOCKS_AVAILABLE = True
-except ImportError:
-    SOCKS_AVAILABLE = False
+# stem is slow to import and only needed for control-port work, so it is
+# loaded on first use by _load_stem()
+Signal = None
+Controller = None
+EventType = None
+STEM_AVAILABLE = None
+
+# pysocks is only probed here; requests imports it itself for socks5h proxies
+SOCKS_AVAILABLE = importlib.util.find_spec('socks') is not None
+if not SOCKS_AVAILABLE:
     print("Warning: pysocks library not available. Install with: pip install pysocks")
 
+def _load_stem():
+    """Import stem on first use and report whether it is available"""
+    global Signal, Controller, EventType, STEM_AVAILABLE
+    if STEM_AVAILABLE is None:
+        try:
+            from stem import Signal
+            from stem.control import Controller, EventType
+            STEM_AVAILABLE = True
+        except ImportError:
+            STEM_AVAILABLE = False
+            print("Warning: stem library not available. Install with: pip install stem")
+    return STEM_AVAILABLE
+
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
+# Shared pool for overlapping independent requests through Tor
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+# Whole-line non-negative integer, tolerating surrounding whitespace
+_INT_RE = re.compile(r'\A\s*(\d+)\s*\Z')
+
+# Static banner sections; only version, author and session time vary per call
+_BANNER_ART = """
+████████╗ ██████╗ ██████╗ ███████╗██╗  ██╗██╗███████╗████████╗
+╚══██╔══╝██╔═══██╗██╔══██╗██╔════╝██║  ██║██║██╔════╝╚══██╔══╝
+   ██║   ██║   ██║██████╔╝███████╗███████║██║█████╗     ██║   
+   ██║   ██║   ██║██╔══██╗╚════██║██╔══██║██║██╔══╝     ██║   
+   ██║   ╚██████╔╝██║  ██║███████║██║  ██║██║██║        ██║   
+   ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝╚═╝╚═╝        ╚═╝   
+
+"""
+
+_BANNER_NOTICE = """[+] Purpose: Authorized Security Research & Penetration Testing
+[+] OPSEC: Ensure testing is conducted in authorized environments only
+
+[*] Security Classifications:
+    - CWE-200: Information Exposure Prevention
+    - CWE-319: Cleartext Transmission Mitigation
+    - OWASP ASVS: V9.2.1 Network Communications Security
+    - NIST SP 800-115: Information Security Testing Compliance
+
+[!] Auto IP Rotation: Every 5 minutes when enabled
+"""
+
+_STATUS_PASS = "\033[92mPASS\033[0m"
+_STATUS_FAIL = "\033[91mFAIL\033[0m"
+_VERIFY_PASS = f"[+] Tor installation verification: {_STATUS_PASS}\n"
+_VERIFY_FAIL = f"[-] Tor installation verification: {_STATUS_FAIL}\n"
+
+# 64 KiB reads; streamed command output keeps at most this many for the summary
+_OUTPUT_TAIL_CHUNKS = 16
+
+_DEFAULT_BLOCKED_COUNTRIES = frozenset(['CN', 'RU', 'KP', 'IR', 'SY', 'BY'])
+
+# (url, response type, JSON key) for external IP echo services
+_IP_SERVICES = (
+    ('https://httpbin.org/ip', 'json', 'origin'),
+    ('https://api.ipify.org?format=json', 'json', 'ip'),
+    ('https://ifconfig.me/ip', 'text', None),
+    ('https://icanhazip.com', 'text', None),
+    ('https://ident.me', 'text', None)
+)
+
+_PROXYCHAINS_TEMPLATE = """
+# TorShift ProxyChains Configuration
+# Generated by 0nsec Security Research Framework
+# Purpose: Authorized security testing and research
+
+{chain_options}
+proxy_dns
+remote_dns_subnet 224
+tcp_read_time_out 15000
+tcp_connect_time_out 8000
+
+# Local network exclusions (RFC 1918)
+localnet 127.0.0.0/255.0.0.0
+localnet 10.0.0.0/255.0.0.0
+localnet 172.16.0.0/255.240.0.0
+localnet 192.168.0.0/255.255.0.0
+localnet 169.254.0.0/255.255.0.0
+
+[ProxyList]
+{proxy_list}
+"""
+
+class _LazyJSON:
+    """Defer json.dumps until a log handler actually formats the record"""
+    def __init__(self, obj, **dumps_kwargs):
+        self.obj = obj
+        self.dumps_kwargs = dumps_kwargs
+        self._text = None
+
+    def __str__(self):
+        # Every handler formats the record, so serialize only once
+        if self._text is None:
+            self._text = json.dumps(self.obj, **self.dumps_kwargs)
+        return self._text
+
 class TorShift:
+    DOH_HEADERS = {'Accept': 'application/dns-json'}
+
     def __init__(self, config=None):
         self.version = "2.1.0"
         self.author = "0nsec Security Research"
@@ -55,10 +161,14 @@ class TorShift:
         self.tor_proxy_port = 9050
         self.tor_control_port = 9051
         self.tor_password = "0nsecTorShift2025"
+        self.isolated_circuits = 1  # >1 spreads traffic over circuits via SOCKS auth isolation
         
         # Operational parameters
         self.current_ip = None
-        self.previous_ips = []
+        self._ip_cache = None  # (ip, timestamp)
+        self.ip_cache_ttl = 30
+        self._ip_service_failures = {}  # url -> (failure count, next attempt timestamp)
+        self.previous_ips = deque(maxlen=32)
         self.rotation_interval = 300  # 5 minutes default
         self.auto_rotate = False
         self.rotation_count = 0
@@ -66,15 +176,64 @@ class TorShift:
         self.last_rotation_time = 0
         
         # Security settings OSEC...
-        self.blocked_countries = ['CN', 'RU', 'KP', 'IR', 'SY', 'BY']
+        self.blocked_countries = _DEFAULT_BLOCKED_COUNTRIES
+        self._custom_exit_exclusions = False  # pushed to Tor only once the user changes them
+        self._torrc_exit_exclusions = None  # ExcludeExitNodes from torrc, kept in state until reset
         self.allowed_countries = []
         self.exit_nodes = []
         self.max_rotation_attempts = 3
+        self.circuit_build_timeout = 15
+        self._doh_url = 'https://1.1.1.1/dns-query'
+        self._tor_check_url = 'https://check.torproject.org/api/ip'
         
         # Session management
         self.session = requests.Session()
+        # socks5h resolves hostnames inside Tor rather than via the local resolver
+        self._proxies = {
+            'http': f'socks5h://{self.tor_proxy_host}:{self.tor_proxy_port}',
+            'https': f'socks5h://{self.tor_proxy_host}:{self.tor_proxy_port}'
+        }
+        self.session.proxies = self._proxies
+        # Skip per-request netrc/env proxy lookups; env proxies would also override Tor
+        self.session.trust_env = False
+        # Keep connections through Tor alive across checks instead of reconnecting
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.logger = self._setup_logging()
         self.rotation_thread = None
+        self._stop_event = threading.Event()
+        self._shutdown = threading.Event()
+        self._tor_service_cache = (0, False)  # (timestamp, result)
+        self.tor_service_cache_ttl = 30
+        self._verify_cache = (0, False)  # (timestamp, result)
+        self.verify_cache_ttl = 10
+        self._controller = None
+        self._controller_lock = threading.Lock()
+        self._cookie_chmod_attempted = False
+        self._proxychains_hash = None
+        self._proxychains_prefix = None
+        self._created_files = set()
+        
+        # Settings and the last successful verification persist across runs
+        self._state_path = os.path.expanduser('~/.torshift/state.json')
+        self._tor_verified_at = 0
+        self.verified_state_ttl = 3600
+        self._load_state()
+
+        # Interactive menu dispatch; a handler returning True leaves the menu
+        self._menu = {
+            '1': self._menu_rotate_ip,
+            '2': self._menu_show_status,
+            '3': self._menu_test_connectivity,
+            '4': self._menu_execute_command,
+            '5': self._menu_circuit_info,
+            '6': self._menu_toggle_rotation,
+            '7': self._menu_dns_leak_test,
+            '8': self._menu_generate_report,
+            '9': self._menu_set_country_exclusions,
+            '0': self._menu_exit,
+        }
 
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -86,10 +245,12 @@ class TorShift:
         
         # Console handler
         console_handler = logging.StreamHandler()
-        console_formatter = logging.Formatter(
-            '\033[92m[%(asctime)s]\033[0m \033[94m%(levelname)s\033[0m - %(message)s',
-            datefmt='%H:%M:%S'
-        )
+        if sys.stderr.isatty():
+            console_format = '\033[92m[%(asctime)s]\033[0m \033[94m%(levelname)s\033[0m - %(message)s'
+        else:
+            # No colour codes when output is piped or redirected
+            console_format = '[%(asctime)s] %(levelname)s - %(message)s'
+        console_formatter = logging.Formatter(console_format, datefmt='%H:%M:%S')
         console_handler.setFormatter(console_formatter)
         logger.addHandler(console_handler)
 
@@ -104,9 +265,49 @@ class TorShift:
         
         return logger
 
+    def _load_state(self):
+        """Restore settings persisted by a previous run"""
+        try:
+            with open(self._state_path) as f:
+                state = json.load(f)
+            rotation_interval = int(state.get('rotation_interval', self.rotation_interval))
+            if rotation_interval > 0:
+                self.rotation_interval = rotation_interval
+            self._tor_verified_at = float(state.get('tor_verified_at', 0))
+            if 'blocked_countries' in state:
+                self.blocked_countries = frozenset(sys.intern(str(c).upper())
+                                                   for c in state['blocked_countries'])
+                self._custom_exit_exclusions = True
+            if 'torrc_exit_exclusions' in state:
+                self._torrc_exit_exclusions = str(state['torrc_exit_exclusions'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.logger.warning("Ignoring unreadable state file %s: %s", self._state_path, e)
+
+    def _save_state(self):
+        """Atomically persist settings for the next run"""
+        state = {
+            'rotation_interval': self.rotation_interval,
+            'tor_verified_at': self._tor_verified_at
+        }
+        if self._custom_exit_exclusions:
+            state['blocked_countries'] = sorted(self.blocked_countries)
+        if self._torrc_exit_exclusions is not None:
+            state['torrc_exit_exclusions'] = self._torrc_exit_exclusions
+        
+        tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._state_path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            self.logger.warning("Could not save state to %s: %s", self._state_path, e)
+
     def _signal_handler(self, signum, frame):
         """Handle graceful shutdown with operational cleanup"""
-        self.logger.info(f"Received termination signal {signum}")
+        self.logger.info("Received termination signal %s", signum)
         self.stop_automatic_rotation()
         self._cleanup_session()
         sys.exit(0)
@@ -115,117 +316,138 @@ class TorShift:
         """Clean up session and temporary files"""
         try:
             self.session.close()
-            temp_files = ['/tmp/torshift_proxychains.conf']
-            for temp_file in temp_files:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    self.logger.debug(f"Cleaned up temporary file: {temp_file}")
+            self._close_controller()
+            while self._created_files:
+                temp_file = self._created_files.pop()
+                try:
+                    os.unlink(temp_file)
+                    self.logger.debug("Cleaned up temporary file: %s", temp_file)
+                except OSError as e:
+                    self.logger.debug("Could not remove temporary file %s: %s", temp_file, e)
         except Exception as e:
-            self.logger.error(f"Error during cleanup: {e}")
+            self.logger.error("Error during cleanup: %s", e)
 
     def banner(self):
         """Display professional security research banner"""
-        print(f"""
-████████╗ ██████╗ ██████╗ ███████╗██╗  ██╗██╗███████╗████████╗
-╚══██╔══╝██╔═══██╗██╔══██╗██╔════╝██║  ██║██║██╔════╝╚══██╔══╝
-   ██║   ██║   ██║██████╔╝███████╗███████║██║█████╗     ██║   
-   ██║   ██║   ██║██╔══██╗╚════██║██╔══██║██║██╔══╝     ██║   
-   ██║   ╚██████╔╝██║  ██║███████║██║  ██║██║██║        ██║   
-   ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝╚═╝╚═╝        ╚═╝   
-
-[+] TorShift v{self.version} - Advanced Tor-Based IP Rotation Framework
-[+] Author: {self.author}
-[+] Purpose: Authorized Security Research & Penetration Testing
-[+] OPSEC: Ensure testing is conducted in authorized environments only
+        sys.stdout.write(f"{_BANNER_ART}"
+                         f"[+] TorShift v{self.version} - Advanced Tor-Based IP Rotation Framework\n"
+                         f"[+] Author: {self.author}\n"
+                         f"{_BANNER_NOTICE}"
+                         f"[!] Current Session: {time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())}\n\n")
 
-[*] Security Classifications:
-    - CWE-200: Information Exposure Prevention
-    - CWE-319: Cleartext Transmission Mitigation
-    - OWASP ASVS: V9.2.1 Network Communications Security
-    - NIST SP 800-115: Information Security Testing Compliance
-
-[!] Auto IP Rotation: Every 5 minutes when enabled
-[!] Current Session: {time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())}
-        """)
-
-    def verify_tor_installation(self):
+    def verify_tor_installation(self, use_persisted=True):
         """Comprehensive Tor installation and configuration verification"""
+        checked_at, result = self._verify_cache
+        if time.time() - checked_at < self.verify_cache_ttl:
+            return result
+        
+        ports = self._check_ports([self.tor_proxy_port, self.tor_control_port])
+        
+        # A recent run already verified everything; trust it while Tor still answers
+        if use_persisted and time.time() - self._tor_verified_at < self.verified_state_ttl:
+            if all(ports.values()):
+                self.logger.info("Tor installation verified by a recent run, skipping full checks")
+                self._verify_cache = (time.time(), True)
+                return True
+        
         checks = {
-            'tor_service': self._check_tor_service(),
-            'tor_proxy': self._check_tor_proxy(),
-            'tor_control': self._check_tor_control(),
+            'tor_service': self._check_tor_service(ports[self.tor_proxy_port]),
+            'tor_proxy': ports[self.tor_proxy_port],
+            'tor_control': ports[self.tor_control_port],
             'stem_library': self._check_stem_library(),
             'proxychains': self._check_proxychains()
         }
         
         self.logger.info("Performing Tor installation verification:")
         for check, status in checks.items():
-            status_text = "\033[92mPASS\033[0m" if status else "\033[91mFAIL\033[0m"
-            self.logger.info(f"  {check.replace('_', ' ').title()}: {status_text}")
+            status_text = _STATUS_PASS if status else _STATUS_FAIL
+            self.logger.info("  %s: %s", check.replace('_', ' ').title(), status_text)
         
-        return all(checks.values())
+        result = all(checks.values())
+        self._verify_cache = (time.time(), result)
+        if result:
+            self._tor_verified_at = time.time()
+            self._save_state()
+        return result
 
-    def _check_tor_service(self):
+    def _check_tor_service(self, proxy_reachable=None):
         """Verify Tor service status"""
+        checked_at, result = self._tor_service_cache
+        if result and time.time() - checked_at < self.tor_service_cache_ttl:
+            return True
+
+        # A listening SOCKS port is the strongest signal that Tor is up;
+        # fall back to scanning /proc for a running tor process
+        if proxy_reachable is None:
+            proxy_reachable = self._check_tor_proxy()
+        result = proxy_reachable or self._find_tor_process()
+        self._tor_service_cache = (time.time(), result)
+        return result
+
+    def _find_tor_process(self):
+        """Scan /proc for a running tor process"""
         try:
-            # First try systemctl (for systemd systems)
-            result = subprocess.run(['systemctl', 'is-active', 'tor'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0 and result.stdout.strip() == 'active':
-                return True
-        except:
-            pass
-            
-        try:
-            # Fallback to service command (for container/non-systemd environments)
-            result = subprocess.run(['service', 'tor', 'status'], 
-                                  capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            pass
-            
-        try:
-            # Final fallback: check if tor process is running
-            result = subprocess.run(['pgrep', 'tor'], 
-                                  capture_output=True, text=True)
-            return result.returncode == 0 and result.stdout.strip()
-        except:
+            pids = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+        except OSError:
             return False
 
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/comm') as f:
+                    if f.read().strip() == 'tor':
+                        return True
+            except OSError:
+                continue
+        return False
+
     def _check_tor_proxy(self):
         """Verify Tor SOCKS proxy accessibility"""
-        try:
-            sock = socket.socket()
-            sock.settimeout(5)
-            result = sock.connect_ex((self.tor_proxy_host, self.tor_proxy_port))
-            sock.close()
-            return result == 0
-        except:
-            return False
+        return self._check_ports([self.tor_proxy_port])[self.tor_proxy_port]
 
     def _check_tor_control(self):
         """Verify Tor control port accessibility"""
+        return self._check_ports([self.tor_control_port])[self.tor_control_port]
+
+    def _check_ports(self, ports, timeout=5):
+        """Probe several Tor ports concurrently, returning {port: accessible}"""
+        results = {port: False for port in ports}
+        pending = {}
         try:
-            sock = socket.socket()
-            sock.settimeout(5)
-            result = sock.connect_ex((self.tor_proxy_host, self.tor_control_port))
-            sock.close()
-            return result == 0
-        except:
-            return False
+            for port in ports:
+                sock = socket.socket()
+                sock.setblocking(False)
+                err = sock.connect_ex((self.tor_proxy_host, port))
+                if err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    pending[sock] = port
+                else:
+                    results[port] = err == 0
+                    sock.close()
+            
+            deadline = time.time() + timeout
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                _, writable, _ = select.select([], list(pending), [], remaining)
+                for sock in writable:
+                    port = pending.pop(sock)
+                    results[port] = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+                    sock.close()
+        except OSError as e:
+            self.logger.debug("Port check failed: %s", e)
+        finally:
+            for sock in pending:
+                sock.close()
+        
+        return results
 
     def _check_stem_library(self):
         """Verify stem library availability"""
-        return STEM_AVAILABLE
+        return importlib.util.find_spec('stem') is not None
 
     def _check_proxychains(self):
         """Verify ProxyChains4 installation"""
-        try:
-            result = subprocess.run(['which', 'proxychains4'], 
-                                  capture_output=True, text=True)
-            return bool(result.stdout.strip())
-        except:
-            return False
+        return shutil.which('proxychains4') is not None
 
     def initialize_tor_service(self):
         """Initialize and configure Tor service for security operations"""
@@ -243,8 +465,10 @@ class TorShift:
                     subprocess.run(['sudo', 'service', 'tor', 'start'], 
                                  check=True, capture_output=True)
                 time.sleep(10)  # Allow Tor initialization
+                self._tor_service_cache = (0, False)
+                self._verify_cache = (0, False)
             except subprocess.CalledProcessError as e:
-                self.logger.warning(f"Could not start Tor service: {e}")
+                self.logger.warning("Could not start Tor service: %s", e)
                 # Continue anyway if ports are accessible
                 pass
 
@@ -253,7 +477,7 @@ class TorShift:
             return True
         else:
             # If service check fails but ports are accessible, allow operation
-            if self._check_tor_proxy() and self._check_tor_control():
+            if all(self._check_ports([self.tor_proxy_port, self.tor_control_port]).values()):
                 self.logger.warning("Tor service check failed but ports are accessible - continuing")
                 return True
             self.logger.error("Tor service initialization failed")
@@ -261,87 +485,131 @@ class TorShift:
 
     def configure_proxychains(self, config_path="/tmp/torshift_proxychains.conf"):
         """Generate ProxyChains configuration optimized for security research"""
-        proxychains_config = f"""
-# TorShift ProxyChains Configuration
-# Generated by 0nsec Security Research Framework
-# Purpose: Authorized security testing and research
-
-strict_chain
-proxy_dns
-remote_dns_subnet 224
-tcp_read_time_out 15000
-tcp_connect_time_out 8000
-
-# Local network exclusions (RFC 1918)
-localnet 127.0.0.0/255.0.0.0
-localnet 10.0.0.0/255.0.0.0
-localnet 172.16.0.0/255.240.0.0
-localnet 192.168.0.0/255.255.0.0
-localnet 169.254.0.0/255.255.0.0
-
-[ProxyList]
-socks5 {self.tor_proxy_host} {self.tor_proxy_port}
-"""
+        config_hash = hash((config_path, self.tor_proxy_host, self.tor_proxy_port,
+                            self.isolated_circuits))
+        if config_hash == self._proxychains_hash and os.path.exists(config_path):
+            return config_path
+        
+        if self.isolated_circuits > 1:
+            # Tor isolates streams by SOCKS credentials, so each entry is its own
+            # circuit; proxychains picks one per connection instead of chaining them
+            chain_options = "random_chain\nchain_len = 1"
+            proxy_list = "\n".join(
+                f"socks5 {self.tor_proxy_host} {self.tor_proxy_port} torshift{i} torshift"
+                for i in range(self.isolated_circuits)
+            )
+            self.logger.warning("Circuit isolation enabled (%d circuits): proxied commands exit through "
+                                "circuits other than the one whose IP TorShift reports", self.isolated_circuits)
+        else:
+            chain_options = "strict_chain"
+            proxy_list = f"socks5 {self.tor_proxy_host} {self.tor_proxy_port}"
+        
+        proxychains_config = _PROXYCHAINS_TEMPLATE.format(chain_options=chain_options,
+                                                          proxy_list=proxy_list)
         
         try:
             with open(config_path, 'w') as f:
                 f.write(proxychains_config)
-            self.logger.info(f"ProxyChains configuration written to {config_path}")
+            self._proxychains_hash = config_hash
+            self._created_files.add(config_path)
+            self._proxychains_prefix = ['proxychains4', '-f', config_path, '-q']
+            self.logger.info("ProxyChains configuration written to %s", config_path)
             return config_path
         except Exception as e:
-            self.logger.error(f"Failed to configure ProxyChains: {e}")
+            self.logger.error("Failed to configure ProxyChains: %s", e)
             return None
 
     def get_current_ip_address(self):
         """Retrieve current external IP with multiple verification sources"""
-        self.session.proxies = {
-            'http': f'socks5://{self.tor_proxy_host}:{self.tor_proxy_port}',
-            'https': f'socks5://{self.tor_proxy_host}:{self.tor_proxy_port}'
+        now = time.time()
+        cached = self._ip_cache
+        if cached and now - cached[1] < self.ip_cache_ttl:
+            self.logger.info("Current external IP: %s (cached)", cached[0])
+            return cached[0]
+        
+        ip_services = [service for service in _IP_SERVICES
+                       if now >= self._ip_service_failures.get(service[0], (0, 0))[1]]
+        if not ip_services:
+            # Everything is backing off; better to retry all than to report no IP
+            ip_services = _IP_SERVICES
+        
+        futures = {
+            _EXECUTOR.submit(self._fetch_ip_from_service, service_url, response_type, json_key): service_url
+            for service_url, response_type, json_key in ip_services
         }
-
-        ip_services = [
-            ('https://httpbin.org/ip', 'json', 'origin'),
-            ('https://api.ipify.org?format=json', 'json', 'ip'),
-            ('https://ifconfig.me/ip', 'text', None),
-            ('https://icanhazip.com', 'text', None),
-            ('https://ident.me', 'text', None)
-        ]
         
-        for service_url, response_type, json_key in ip_services:
-            try:
-                response = self.session.get(service_url, timeout=10, verify=False)
-                
-                if response_type == 'json':
-                    ip_address = response.json().get(json_key, '')
-                else:
-                    ip_address = response.text.strip()
+        # Dual-stack services may answer over either family; the first IPv4 answer wins
+        # and IPv6 is only reported when no service returns IPv4, so the IP stays comparable
+        ipv6_address = None
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=10):
+                service_url = futures[future]
+                try:
+                    ip_address = future.result()
+                except Exception as e:
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug("Failed to retrieve IP from %s: %s", service_url, e)
+                    self._record_ip_service_failure(service_url)
+                    continue
                 
+                self._ip_service_failures.pop(service_url, None)
                 if ip_address and self._validate_ip_format(ip_address):
-                    if self.current_ip != ip_address:
-                        self.previous_ips.append(self.current_ip) if self.current_ip else None
-                        self.current_ip = ip_address
-                    
-                    self.logger.info(f"Current external IP: {ip_address}")
-                    return ip_address
+                    if ipaddress.ip_address(ip_address).version == 6:
+                        ipv6_address = ipv6_address or ip_address
+                        continue
                     
-            except Exception as e:
-                self.logger.debug(f"Failed to retrieve IP from {service_url}: {e}")
-                continue
+                    # Drop requests that have not started yet
+                    for pending in futures:
+                        pending.cancel()
+                    return self._record_current_ip(ip_address)
+        except concurrent.futures.TimeoutError:
+            self.logger.debug("Timed out waiting for IP services")
+        
+        if ipv6_address:
+            return self._record_current_ip(ipv6_address)
         
         self.logger.error("Failed to retrieve current IP from all services")
         return None
 
+    def _record_current_ip(self, ip_address):
+        """Make ip_address the current IP, remembering the previous one"""
+        if self.current_ip != ip_address:
+            self.previous_ips.append(self.current_ip) if self.current_ip else None
+            self.current_ip = ip_address
+        
+        self._ip_cache = (ip_address, time.time())
+        self.logger.info("Current external IP: %s", ip_address)
+        return ip_address
+
+    def _record_ip_service_failure(self, service_url):
+        """Back off exponentially (capped at 60s) from a failing IP service"""
+        fail_count = self._ip_service_failures.get(service_url, (0, 0))[0] + 1
+        self._ip_service_failures[service_url] = (fail_count, time.time() + min(60, 2 ** fail_count))
+
+    def _reset_connection_pool(self):
+        """Drop pooled connections so new requests open fresh Tor streams"""
+        for adapter in self.session.adapters.values():
+            adapter.close()
+
+    def _fetch_ip_from_service(self, service_url, response_type, json_key):
+        """Query a single IP echo service and return the reported address"""
+        response = self.session.get(service_url, timeout=10, verify=False)
+        
+        if response_type == 'json':
+            return response.json().get(json_key, '')
+        return response.text.strip()
+
     def _validate_ip_format(self, ip_address):
-        """Validate IPv4 address format"""
+        """Validate IPv4 or IPv6 address format"""
         try:
-            socket.inet_aton(ip_address)
+            ipaddress.ip_address(ip_address)
             return True
-        except socket.error:
+        except ValueError:
             return False
 
     def rotate_tor_circuit(self):
         """Force new Tor circuit creation with enhanced error handling"""
-        if not STEM_AVAILABLE:
+        if not _load_stem():
             self.logger.error("stem library not available. Install with: pip install stem")
             return False
             
@@ -349,179 +617,243 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
         
         for attempt in range(self.max_rotation_attempts):
             try:
-                with Controller.from_port(port=self.tor_control_port) as controller:
-                    # Try multiple authentication methods in order of preference
-                    authenticated = False
-                    
-                    # Method 1: Try no authentication (if allowed)
-                    try:
-                        controller.authenticate()
-                        authenticated = True
-                        self.logger.debug("Authenticated with no credentials")
-                    except Exception as e:
-                        self.logger.debug(f"No-auth failed: {e}")
-                    
-                    # Method 2: Try with empty password
-                    if not authenticated:
-                        try:
-                            controller.authenticate(password="")
-                            authenticated = True
-                            self.logger.debug("Authenticated with empty password")
-                        except Exception as e:
-                            self.logger.debug(f"Empty password failed: {e}")
-                    
-                    # Method 3: Try with configured password
-                    if not authenticated:
-                        try:
-                            controller.authenticate(password=self.tor_password)
-                            authenticated = True
-                            self.logger.debug("Authenticated with configured password")
-                        except Exception as e:
-                            self.logger.debug(f"Configured password failed: {e}")
-                    
-                    # Method 4: Try to use cookie authentication by changing permissions
-                    if not authenticated:
-                        try:
-                            import subprocess
-                            # Try to make auth cookie readable
-                            subprocess.run(['sudo', 'chmod', '644', '/var/run/tor/control.authcookie'], 
-                                         capture_output=True, timeout=5)
-                            controller.authenticate()
-                            authenticated = True
-                            self.logger.debug("Authenticated using cookie after permission fix")
-                        except Exception as e:
-                            self.logger.debug(f"Cookie auth with permission fix failed: {e}")
-                    
-                    if not authenticated:
-                        # Skip this attempt but don't fail completely
-                        self.logger.warning(f"Authentication failed on attempt {attempt + 1}, trying circuit reset anyway")
-                        # Sometimes NEWNYM works even without full auth
-                        try:
-                            controller.signal(Signal.NEWNYM)
-                        except:
-                            raise Exception("All authentication methods failed and signal failed")
-                    else:
-                        # Signal for new circuit
-                        controller.signal(Signal.NEWNYM)
-                    
-                    self.logger.info(f"NEWNYM signal sent (attempt {attempt + 1})")
-                    
-                    # Wait for circuit establishment
-                    time.sleep(15)
+                controller = self._get_controller()
+                
+                # Tor silently ignores NEWNYM sent within its rate limit window
+                newnym_wait = controller.get_newnym_wait()
+                if newnym_wait > 0:
+                    self.logger.debug("Waiting %.1fs for NEWNYM rate limit", newnym_wait)
+                    time.sleep(newnym_wait)
+                
+                circuit_built = threading.Event()
+                
+                def circuit_listener(event):
+                    if event.status == 'BUILT' and event.purpose == 'GENERAL':
+                        circuit_built.set()
+                
+                controller.add_event_listener(circuit_listener, EventType.CIRC)
+                try:
+                    controller.signal(Signal.NEWNYM)
+                    self.logger.info("NEWNYM signal sent (attempt %s)", attempt + 1)
                     
-                    # Verify IP rotation
-                    old_ip = self.current_ip
-                    new_ip = self.get_current_ip_address()
+                    # Pooled keep-alive connections and the cached IP belong to the old circuit
+                    self._reset_connection_pool()
+                    self._ip_cache = None
                     
-                    if new_ip and new_ip != old_ip:
-                        self.rotation_count += 1
-                        self.logger.info(f"IP rotation successful: {old_ip} -> {new_ip}")
-                        self._log_rotation_metrics()
-                        return True
-                    else:
-                        self.logger.warning(f"IP rotation attempt {attempt + 1} failed - same IP returned")
-                        # Wait a bit longer for next attempt
-                        time.sleep(10)
+                    # Continue as soon as Tor reports a fresh circuit rather than always sleeping
+                    if not circuit_built.wait(self.circuit_build_timeout):
+                        self.logger.debug("No new circuit reported before timeout, checking IP anyway")
+                finally:
+                    controller.remove_event_listener(circuit_listener)
+                
+                # Verify IP rotation
+                old_ip = self.current_ip
+                new_ip = self.get_current_ip_address()
+                
+                if (new_ip and old_ip and new_ip != old_ip and
+                        ipaddress.ip_address(new_ip).version != ipaddress.ip_address(old_ip).version):
+                    # A v4 <-> v6 switch says nothing about whether the exit changed
+                    self.logger.warning("IP rotation attempt %s inconclusive - address family changed", attempt + 1)
+                    time.sleep(10)
+                elif new_ip and new_ip != old_ip:
+                    self.rotation_count += 1
+                    self.logger.info("IP rotation successful: %s -> %s", old_ip, new_ip)
+                    self._log_rotation_metrics()
+                    return True
+                else:
+                    self.logger.warning("IP rotation attempt %s failed - same IP returned", attempt + 1)
+                    # Wait a bit longer for next attempt
+                    time.sleep(10)
                         
             except Exception as e:
-                self.logger.error(f"Circuit rotation attempt {attempt + 1} failed: {e}")
+                self.logger.error("Circuit rotation attempt %s failed: %s", attempt + 1, e)
+                self._close_controller()
                 time.sleep(5)  # Brief delay before retry
         
         self.logger.error("All circuit rotation attempts failed")
         return False
 
+    def _get_controller(self):
+        """Return the shared authenticated Tor controller, connecting on first use"""
+        with self._controller_lock:
+            if self._controller is not None and self._controller.is_alive():
+                return self._controller
+
+            self._controller = None
+            controller = Controller.from_port(port=self.tor_control_port)
+            
+            if not self._authenticate_controller(controller):
+                controller.close()
+                raise Exception("All authentication methods failed")
+            
+            if self._custom_exit_exclusions:
+                try:
+                    self._push_exit_exclusions(controller)
+                except Exception as e:
+                    self.logger.warning("Could not apply country exclusions to Tor: %s", e)
+            
+            self._controller = controller
+            return controller
+
+    def set_blocked_countries(self, countries):
+        """Set exit country exclusions from a comma-separated list and add them to Tor's"""
+        self.blocked_countries = frozenset(sys.intern(c.strip().upper())
+                                           for c in countries.split(',') if c.strip())
+        self._custom_exit_exclusions = True
+        self._save_state()
+        
+        if not _load_stem():
+            return
+        try:
+            controller = self._controller
+            if controller is not None and controller.is_alive():
+                self._push_exit_exclusions(controller)
+            else:
+                self._get_controller()  # pushes the exclusions once connected
+        except Exception as e:
+            self.logger.warning("Could not apply country exclusions to Tor: %s", e)
+
+    def _push_exit_exclusions(self, controller):
+        """Extend Tor's configured ExcludeExitNodes with the blocked countries"""
+        # SETCONF replaces the option, so keep the torrc entries and only ever add to them.
+        # The live value includes what earlier runs added, so torrc's is read only before
+        # the first push and then persisted until reset_blocked_countries() reloads torrc
+        if self._torrc_exit_exclusions is None:
+            self._torrc_exit_exclusions = controller.get_conf('ExcludeExitNodes', '') or ''
+            self._save_state()
+        entries = [entry.strip() for entry in self._torrc_exit_exclusions.split(',') if entry.strip()]
+        present = {entry.lower() for entry in entries}
+        for code in sorted(self.blocked_countries):
+            entry = f'{{{code.lower()}}}'
+            if entry not in present:
+                entries.append(entry)
+                present.add(entry)
+        
+        if entries:
+            controller.set_conf('ExcludeExitNodes', ','.join(entries))
+        self.logger.info("Exit country exclusions applied: %s", ','.join(entries) or 'none')
+
+    def reset_blocked_countries(self):
+        """Drop custom exit exclusions and return Tor to the ExcludeExitNodes in torrc"""
+        self.blocked_countries = _DEFAULT_BLOCKED_COUNTRIES
+        self._custom_exit_exclusions = False
+        self._torrc_exit_exclusions = None
+        self._save_state()
+        
+        if not _load_stem():
+            return
+        try:
+            # RESETCONF would fall back to Tor's built-in empty default; RELOAD re-reads torrc
+            self._get_controller().signal(Signal.RELOAD)
+            self.logger.info("Exit country exclusions reset to the torrc configuration")
+        except Exception as e:
+            self.logger.warning("Could not reset country exclusions in Tor: %s", e)
+
+    def _authenticate_controller(self, controller):
+        """Authenticate a Tor controller, trying each supported method in order"""
+        methods = [
+            ("no credentials", {}),
+            ("empty password", {'password': ""}),
+            ("configured password", {'password': self.tor_password}),
+        ]
+        for description, credentials in methods:
+            try:
+                controller.authenticate(**credentials)
+                self.logger.debug("Authenticated with %s", description)
+                return True
+            except Exception as e:
+                self.logger.debug("Authentication with %s failed: %s", description, e)
+        
+        # Last resort: make the auth cookie readable, at most once per process
+        if not self._cookie_chmod_attempted:
+            self._cookie_chmod_attempted = True
+            try:
+                cookie_path = '/var/run/tor/control.authcookie'
+                if not os.access(cookie_path, os.R_OK):
+                    subprocess.run(['sudo', 'chmod', '644', cookie_path], 
+                                 capture_output=True, timeout=5)
+                controller.authenticate()
+                self.logger.debug("Authenticated using cookie after permission fix")
+                return True
+            except Exception as e:
+                self.logger.debug("Cookie auth with permission fix failed: %s", e)
+        
+        self.logger.warning("All Tor controller authentication methods failed")
+        return False
+
+    def _close_controller(self):
+        """Close the shared Tor controller so the next use reconnects"""
+        with self._controller_lock:
+            controller, self._controller = self._controller, None
+        if controller is not None:
+            try:
+                controller.close()
+            except Exception as e:
+                self.logger.debug("Error closing controller: %s", e)
+
     def _log_rotation_metrics(self):
         """Log rotation performance metrics for operational analysis"""
         uptime = time.time() - self.start_time
         avg_rotation_time = uptime / self.rotation_count if self.rotation_count > 0 else 0
         
-        self.logger.info(f"Rotation metrics - Count: {self.rotation_count}, "
-                        f"Uptime: {uptime:.1f}s, Avg interval: {avg_rotation_time:.1f}s")
+        self.logger.info("Rotation metrics - Count: %d, Uptime: %.1fs, Avg interval: %.1fs",
+                         self.rotation_count, uptime, avg_rotation_time)
 
     def get_tor_circuit_information(self):
         """Retrieve detailed Tor circuit path information"""
-        if not STEM_AVAILABLE:
+        if not _load_stem():
             self.logger.error("stem library not available. Install with: pip install stem")
             return None
             
         try:
-            with Controller.from_port(port=self.tor_control_port) as controller:
-                # Try multiple authentication methods
-                authenticated = False
-                
-                try:
-                    controller.authenticate()
-                    authenticated = True
-                except:
-                    pass
-                
-                if not authenticated:
-                    try:
-                        controller.authenticate(password=self.tor_password)
-                        authenticated = True
-                    except:
-                        pass
-                
-                if not authenticated:
-                    try:
-                        controller.authenticate(password="")
-                        authenticated = True
-                    except:
-                        pass
-                
-                if not authenticated:
-                    raise Exception("Authentication failed")
-                
-                circuits = controller.get_circuits()
-                active_circuits = [c for c in circuits if c.status == 'BUILT']
+            controller = self._get_controller()
+            circuits = controller.get_circuits()
+            active_circuits = [c for c in circuits if c.status == 'BUILT']
+            
+            if active_circuits:
+                circuit = active_circuits[0]
+                circuit_info = {
+                    'id': circuit.id,
+                    'status': circuit.status,
+                    'path': [f"{relay.fingerprint[:8]}({relay.nickname})" for relay in circuit.path],
+                    'build_time': circuit.build_time,
+                    'purpose': circuit.purpose
+                }
                 
-                if active_circuits:
-                    circuit = active_circuits[0]
-                    circuit_info = {
-                        'id': circuit.id,
-                        'status': circuit.status,
-                        'path': [f"{relay.fingerprint[:8]}({relay.nickname})" for relay in circuit.path],
-                        'build_time': circuit.build_time,
-                        'purpose': circuit.purpose
-                    }
-                    
-                    self.logger.info(f"Active circuit: {' -> '.join(circuit_info['path'])}")
-                    return circuit_info
-                    
-                return None
+                self.logger.info("Active circuit: %s", ' -> '.join(circuit_info['path']))
+                return circuit_info
                 
+            return None
+            
         except Exception as e:
-            self.logger.error(f"Failed to retrieve circuit information: {e}")
+            self.logger.error("Failed to retrieve circuit information: %s", e)
+            self._close_controller()
             return None
 
     def start_automatic_rotation(self, interval=300):
         """Initialize automated IP rotation with configurable interval"""
+        if interval <= 0:
+            raise ValueError(f"Rotation interval must be positive, got {interval}")
         self.rotation_interval = interval
+        self._save_state()
         self.auto_rotate = True
         self.last_rotation_time = time.time()
+        self._stop_event.clear()
         
         def rotation_worker():
-            self.logger.info(f"Automatic IP rotation started - interval: {interval}s ({interval//60} minutes)")
+            self.logger.info("Automatic IP rotation started - interval: %ss (%s minutes)", interval, interval//60)
             
-            while self.auto_rotate:
-                time.sleep(30)  # Check every 30 seconds
-                if self.auto_rotate:
-                    current_time = time.time()
-                    time_since_last = current_time - self.last_rotation_time
-                    
-                    if time_since_last >= self.rotation_interval:
-                        self.logger.info(f"Executing automatic IP rotation (every {interval//60} minutes)")
-                        success = self.rotate_tor_circuit()
-                        self.last_rotation_time = current_time
-                        
-                        if success:
-                            self.logger.info(f"Automatic rotation successful. Next rotation in {interval//60} minutes")
-                        else:
-                            self.logger.warning("Automatic rotation failed, will retry at next interval")
-                    else:
-                        remaining = int(self.rotation_interval - time_since_last)
-                        if remaining % 60 == 0:  # Log every minute
-                            self.logger.debug(f"Next automatic rotation in {remaining//60} minutes")
+            # Sleep exactly until the next rotation is due; stop_automatic_rotation wakes us early
+            while not self._stop_event.wait(max(0, self.rotation_interval - (time.time() - self.last_rotation_time))):
+                self.logger.info("Executing automatic IP rotation (every %s minutes)", interval//60)
+                rotation_start = time.time()
+                success = self.rotate_tor_circuit()
+                self.last_rotation_time = rotation_start
+                
+                if success:
+                    self.logger.info("Automatic rotation successful. Next rotation in %s minutes", interval//60)
+                else:
+                    self.logger.warning("Automatic rotation failed, will retry at next interval")
         
         self.rotation_thread = threading.Thread(target=rotation_worker, daemon=True)
         self.rotation_thread.start()
@@ -533,36 +865,79 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
     def stop_automatic_rotation(self):
         """Terminate automatic IP rotation"""
         self.auto_rotate = False
+        self._stop_event.set()
         if self.rotation_thread and self.rotation_thread.is_alive():
             self.rotation_thread.join(timeout=5)
         self.logger.info("Automatic IP rotation stopped")
 
-    def execute_through_proxy(self, command, config_path="/tmp/torshift_proxychains.conf"):
-        """Execute system commands through TorShift proxy chain"""
-        if not os.path.exists(config_path):
-            config_path = self.configure_proxychains()
+    def execute_through_proxy(self, command, config_path="/tmp/torshift_proxychains.conf", stream=False):
+        """Execute system commands (argument list or shell-style string) through TorShift proxy chain"""
+        return self.execute_many_through_proxy([command], config_path, stream)[0]
+
+    def execute_many_through_proxy(self, commands, config_path="/tmp/torshift_proxychains.conf", stream=False):
+        """Execute several commands through the proxy chain concurrently"""
+        # Cheap when the config is already current; rewrites it if host/port changed
+        if not self.configure_proxychains(config_path):
+            return [("", "ProxyChains configuration unavailable", 1) for _ in commands]
+        
+        async def run_all():
+            return await asyncio.gather(*(self._execute_through_proxy_async(command, stream=stream)
+                                          for command in commands))
         
+        return asyncio.run(run_all())
+
+    async def _execute_through_proxy_async(self, command, timeout=120, stream=False):
+        """Run one proxied command as an asyncio subprocess, optionally streaming its output"""
         try:
-            proxychains_command = ['proxychains4', '-f', config_path, '-q'] + command.split()
+            command_list = shlex.split(command) if isinstance(command, str) else list(command)
+            proxychains_command = self._proxychains_prefix + command_list
             
-            self.logger.info(f"Executing through proxy: {command}")
-            result = subprocess.run(
-                proxychains_command,
-                capture_output=True,
-                text=True,
-                timeout=120
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Executing through proxy: %s", ' '.join(shlex.quote(arg) for arg in command_list))
+            process = await asyncio.create_subprocess_exec(
+                *proxychains_command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
             
-            self.logger.info(f"Command completed - Exit code: {result.returncode}")
-            return result.stdout, result.stderr, result.returncode
+            tail_length = _OUTPUT_TAIL_CHUNKS if stream else None
+            stdout, stderr = deque(maxlen=tail_length), deque(maxlen=tail_length)
+            try:
+                await asyncio.wait_for(asyncio.gather(
+                    self._pump_output(process.stdout, sys.stdout if stream else None, stdout),
+                    self._pump_output(process.stderr, sys.stderr if stream else None, stderr),
+                    process.wait()
+                ), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                self.logger.error("Command execution timeout (%ss)", timeout)
+                return "", "Command timeout", 124
+            
+            self.logger.info("Command completed - Exit code: %s", process.returncode)
+            return (b"".join(stdout).decode(errors='replace'), b"".join(stderr).decode(errors='replace'),
+                    process.returncode)
             
-        except subprocess.TimeoutExpired:
-            self.logger.error("Command execution timeout (120s)")
-            return "", "Command timeout", 124
         except Exception as e:
-            self.logger.error(f"Command execution failed: {e}")
+            self.logger.error("Command execution failed: %s", e)
             return "", str(e), 1
 
+    async def _pump_output(self, reader, sink, retained):
+        """Drain a subprocess pipe into retained, echoing each chunk to sink if given"""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            retained.append(chunk)
+            if sink is not None:
+                sink.flush()
+                if hasattr(sink, 'buffer'):
+                    sink.buffer.write(chunk)
+                    sink.buffer.flush()
+                else:
+                    sink.write(chunk.decode(errors='replace'))
+                    sink.flush()
+
     def test_proxy_connectivity(self, target_urls=None):
         """Comprehensive proxy connectivity verification"""
         if not target_urls:
@@ -575,11 +950,15 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
         self.logger.info("Testing proxy connectivity across multiple targets")
         results = {}
         
-        for url in target_urls:
+        # Spread targets over isolated circuits so they don't share one exit's bandwidth
+        futures = [
+            (url, _EXECUTOR.submit(self._timed_get, url, 15, self._isolated_proxies(index)))
+            for index, url in enumerate(target_urls)
+        ]
+        # Requests run concurrently; results are collected and logged in target order
+        for url, future in futures:
             try:
-                start_time = time.time()
-                response = self.session.get(url, timeout=15, verify=False)
-                response_time = time.time() - start_time
+                response, response_time = future.result()
                 
                 results[url] = {
                     'status_code': response.status_code,
@@ -588,17 +967,32 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
                 }
                 
                 status = "\033[92mSUCCESS\033[0m" if response.status_code == 200 else "\033[91mFAILED\033[0m"
-                self.logger.info(f"  {url}: {status} ({response.status_code}, {response_time:.2f}s)")
+                self.logger.info("  %s: %s (%s, %.2fs)", url, status, response.status_code, response_time)
                 
             except Exception as e:
                 results[url] = {'success': False, 'error': str(e)}
-                self.logger.error(f"  {url}: \033[91mFAILED\033[0m - {e}")
+                self.logger.error("  %s: \033[91mFAILED\033[0m - %s", url, e)
         
         success_rate = sum(1 for r in results.values() if r.get('success', False)) / len(results) * 100
-        self.logger.info(f"Connectivity test completed - Success rate: {success_rate:.1f}%")
+        self.logger.info("Connectivity test completed - Success rate: %.1f%%", success_rate)
         
         return results
 
+    def _isolated_proxies(self, index):
+        """Return proxies whose SOCKS credentials pin requests to one of the isolated circuits"""
+        if self.isolated_circuits <= 1:
+            return self._proxies
+        
+        proxy_url = (f'socks5h://torshift{index % self.isolated_circuits}:torshift@'
+                     f'{self.tor_proxy_host}:{self.tor_proxy_port}')
+        return {'http': proxy_url, 'https': proxy_url}
+
+    def _timed_get(self, url, timeout, proxies=None):
+        """Fetch a URL through the session and return (response, elapsed seconds)"""
+        start_time = time.time()
+        response = self.session.get(url, timeout=timeout, verify=False, proxies=proxies)
+        return response, time.time() - start_time
+
     def perform_dns_leak_test(self):
         """Verify DNS queries are properly routed through Tor"""
         self.logger.info("Performing DNS leak detection test")
@@ -606,28 +1000,47 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
         test_domains = ['google.com', 'github.com', 'stackoverflow.com']
         
         try:
-            dns_test_url = 'https://1.1.1.1/dns-query'
+            # The exit check hostname is resolved by Tor (socks5h), so a single
+            # request confirms both remote resolution and the exit; it runs
+            # alongside the DoH queries, which share the pooled resolver connection
+            tor_check = _EXECUTOR.submit(self.session.get, self._tor_check_url, timeout=10, verify=False)
+            futures = [(domain, _EXECUTOR.submit(self._query_doh, domain)) for domain in test_domains]
             
-            for domain in test_domains:
-                response = self.session.get(
-                    dns_test_url,
-                    params={'name': domain, 'type': 'A'},
-                    headers={'Accept': 'application/dns-json'},
-                    timeout=10,
-                    verify=False
-                )
+            for domain, future in futures:
+                response = future.result()
                 
                 if response.status_code == 200:
-                    self.logger.info(f"DNS resolution for {domain}: \033[92mROUTED THROUGH PROXY\033[0m")
+                    self.logger.info("DNS resolution for %s: \033[92mROUTED THROUGH PROXY\033[0m", domain)
                 else:
-                    self.logger.warning(f"DNS resolution for {domain}: \033[93mUNCERTAIN\033[0m")
+                    self.logger.warning("DNS resolution for %s: \033[93mUNCERTAIN\033[0m", domain)
             
+            try:
+                exit_info = tor_check.result().json()
+            except Exception as e:
+                self.logger.warning("Tor exit check: \033[93mUNCERTAIN\033[0m - %s", e)
+                return True
+            
+            if not exit_info.get('IsTor'):
+                self.logger.error("Tor exit check: \033[91mNOT A TOR EXIT\033[0m (%s)", exit_info.get('IP'))
+                return False
+            
+            self.logger.info("Tor exit check: \033[92mCONFIRMED\033[0m (%s)", exit_info.get('IP'))
             return True
             
         except Exception as e:
-            self.logger.error(f"DNS leak test failed: {e}")
+            self.logger.error("DNS leak test failed: %s", e)
             return False
 
+    def _query_doh(self, domain):
+        """Resolve a domain's A record via DNS-over-HTTPS through the proxy"""
+        return self.session.get(
+            self._doh_url,
+            params={'name': domain, 'type': 'A'},
+            headers=self.DOH_HEADERS,
+            timeout=10,
+            verify=False
+        )
+
     def generate_operational_report(self):
         """Generate comprehensive operational status report"""
         uptime = time.time() - self.start_time
@@ -640,19 +1053,111 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
             'uptime_seconds': int(uptime),
             'auto_rotation_active': self.auto_rotate,
             'rotation_interval': self.rotation_interval,
-            'previous_ips': self.previous_ips[-5:],  # Last 5 IPs
-            'blocked_countries': self.blocked_countries,
+            'previous_ips': list(self.previous_ips)[-5:],  # Last 5 IPs
+            'blocked_countries': sorted(self.blocked_countries),
             'proxy_configuration': f"{self.tor_proxy_host}:{self.tor_proxy_port}",
             'control_port': self.tor_control_port
         }
         
         self.logger.info("=== TorShift Operational Report ===")
-        self.logger.info(json.dumps(report, indent=2))
+        self.logger.info("%s", _LazyJSON(report, indent=2))
         
         return report
 
+    def _menu_rotate_ip(self):
+        """Menu option 1: rotate the IP address manually"""
+        print("\n[*] Manual IP rotation initiated...")
+        success = self.rotate_tor_circuit()
+        if success:
+            print("[+] IP rotation completed successfully")
+        else:
+            print("[-] IP rotation failed")
+
+    def _menu_show_status(self):
+        """Menu option 2: show current operational status"""
+        print("\n[*] Current operational status:")
+        print(f"    Current IP: {self.current_ip}")
+        print(f"    Rotations performed: {self.rotation_count}")
+        print(f"    Auto-rotation: {'ACTIVE' if self.auto_rotate else 'INACTIVE'}")
+        if self.auto_rotate:
+            print(f"    Rotation interval: {self.rotation_interval}s")
+
+    def _menu_test_connectivity(self):
+        """Menu option 3: test proxy connectivity"""
+        print("\n[*] Testing proxy connectivity...")
+        self.test_proxy_connectivity()
+
+    def _menu_execute_command(self):
+        """Menu option 4: execute a command through the proxy"""
+        command = input("\nEnter command to execute through proxy: ").strip()
+        if command:
+            print(f"\n[*] Executing: {command}")
+            _, _, exit_code = self.execute_through_proxy(command, stream=True)
+            print(f"Exit code: {exit_code}")
+
+    def _menu_circuit_info(self):
+        """Menu option 5: show Tor circuit information"""
+        print("\n[*] Retrieving Tor circuit information...")
+        circuit_info = self.get_tor_circuit_information()
+        if circuit_info:
+            print(f"Circuit ID: {circuit_info['id']}")
+            print(f"Path: {' -> '.join(circuit_info['path'])}")
+            print(f"Status: {circuit_info['status']}")
+
+    def _menu_toggle_rotation(self):
+        """Menu option 6: toggle automatic rotation"""
+        if self.auto_rotate:
+            self.stop_automatic_rotation()
+            print("[+] Automatic rotation stopped")
+        else:
+            match = _INT_RE.match(input(f"Enter rotation interval in seconds (default {self.rotation_interval}): "))
+            interval = int(match.group(1)) if match else 0
+            if interval <= 0:
+                interval = self.rotation_interval
+            self.start_automatic_rotation(interval)
+            print(f"[+] Automatic rotation started (every {interval} seconds)")
+
+    def _menu_dns_leak_test(self):
+        """Menu option 7: perform a DNS leak test"""
+        print("\n[*] Performing DNS leak test...")
+        self.perform_dns_leak_test()
+
+    def _menu_generate_report(self):
+        """Menu option 8: generate the operational report"""
+        print("\n[*] Generating operational report...")
+        self.generate_operational_report()
+
+    def _menu_set_country_exclusions(self):
+        """Menu option 9: set country exclusions"""
+        countries = input("Enter country codes to exclude (comma-separated, 'reset' for torrc defaults): ").strip()
+        if countries.lower() == 'reset':
+            self.reset_blocked_countries()
+            print("[+] Country exclusions reset to torrc defaults")
+        elif countries:
+            self.set_blocked_countries(countries)
+            print(f"[+] Country exclusions updated: {', '.join(sorted(self.blocked_countries))}")
+
+    def _menu_exit(self):
+        """Menu option 0: shut down and leave the menu"""
+        print("\n[*] Shutting down TorShift...")
+        self.stop_automatic_rotation()
+        self._cleanup_session()
+        print("[+] TorShift shutdown complete")
+        return True
+
+    def _menu_invalid_option(self):
+        """Fallback for unrecognised menu input"""
+        print("[-] Invalid option selected")
+
     def interactive_mode(self):
         """Interactive command-line interface for TorShift operations"""
+        # readline gives the prompts line editing and history where available
+        try:
+            import readline
+            readline.set_history_length(100)
+        except ImportError:
+            pass
+        
         self.banner()
         
         if not self.verify_tor_installation():
@@ -686,78 +1191,8 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
                 
                 choice = input("\n[TorShift]> Select option: ").strip()
                 
-                if choice == '1':
-                    print("\n[*] Manual IP rotation initiated...")
-                    success = self.rotate_tor_circuit()
-                    if success:
-                        print("[+] IP rotation completed successfully")
-                    else:
-                        print("[-] IP rotation failed")
-                
-                elif choice == '2':
-                    print("\n[*] Current operational status:")
-                    print(f"    Current IP: {self.current_ip}")
-                    print(f"    Rotations performed: {self.rotation_count}")
-                    print(f"    Auto-rotation: {'ACTIVE' if self.auto_rotate else 'INACTIVE'}")
-                    if self.auto_rotate:
-                        print(f"    Rotation interval: {self.rotation_interval}s")
-                
-                elif choice == '3':
-                    print("\n[*] Testing proxy connectivity...")
-                    self.test_proxy_connectivity()
-                
-                elif choice == '4':
-                    command = input("\nEnter command to execute through proxy: ").strip()
-                    if command:
-                        print(f"\n[*] Executing: {command}")
-                        stdout, stderr, exit_code = self.execute_through_proxy(command)
-                        if stdout:
-                            print(f"STDOUT:\n{stdout}")
-                        if stderr:
-                            print(f"STDERR:\n{stderr}")
-                        print(f"Exit code: {exit_code}")
-                
-                elif choice == '5':
-                    print("\n[*] Retrieving Tor circuit information...")
-                    circuit_info = self.get_tor_circuit_information()
-                    if circuit_info:
-                        print(f"Circuit ID: {circuit_info['id']}")
-                        print(f"Path: {' -> '.join(circuit_info['path'])}")
-                        print(f"Status: {circuit_info['status']}")
-                
-                elif choice == '6':
-                    if self.auto_rotate:
-                        self.stop_automatic_rotation()
-                        print("[+] Automatic rotation stopped")
-                    else:
-                        interval = input("Enter rotation interval in seconds (default 300): ").strip()
-                        interval = int(interval) if interval.isdigit() else 300
-                        self.start_automatic_rotation(interval)
-                        print(f"[+] Automatic rotation started (every {interval} seconds)")
-                
-                elif choice == '7':
-                    print("\n[*] Performing DNS leak test...")
-                    self.perform_dns_leak_test()
-                
-                elif choice == '8':
-                    print("\n[*] Generating operational report...")
-                    self.generate_operational_report()
-                
-                elif choice == '9':
-                    countries = input("Enter country codes to exclude (comma-separated): ").strip()
-                    if countries:
-                        self.blocked_countries = [c.strip().upper() for c in countries.split(',')]
-                        print(f"[+] Country exclusions updated: {self.blocked_countries}")
-                
-                elif choice == '0':
-                    print("\n[*] Shutting down TorShift...")
-                    self.stop_automatic_rotation()
-                    self._cleanup_session()
-                    print("[+] TorShift shutdown complete")
+                if self._menu.get(choice, self._menu_invalid_option)():
                     break
-                
-                else:
-                    print("[-] Invalid option selected")
                     
             except KeyboardInterrupt:
                 print("\n\n[*] Interrupted by user")
@@ -765,10 +1200,21 @@ socks5 {self.tor_proxy_host} {self.tor_proxy_port}
                 self._cleanup_session()
                 break
             except Exception as e:
-                self.logger.error(f"Interactive mode error: {e}")
+                self.logger.error("Interactive mode error: %s", e)
 
-def main():
-    """Main entry point for TorShift framework"""
+# Single-flag invocations common in scripts; these skip building the argparse parser
+_FAST_FLAGS = ('--rotate-once', '--test-connectivity', '--dns-test', '--verify-install', '--generate-report')
+
+def _build_parser():
+    """Build the full command-line parser"""
+    import argparse
+    
+    def positive_int(value):
+        match = _INT_RE.match(value)
+        if not match or int(match.group(1)) <= 0:
+            raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+        return int(match.group(1))
+    
     parser = argparse.ArgumentParser(
         description='TorShift - Advanced Tor-Based IP Rotation Framework',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -783,16 +1229,19 @@ Examples:
     
     parser.add_argument('--interactive', action='store_true', 
                        help='Launch interactive command interface')
-    parser.add_argument('--auto-rotate', type=int, metavar='SECONDS',
+    parser.add_argument('--auto-rotate', type=positive_int, metavar='SECONDS',
                        help='Start automatic rotation with specified interval')
     parser.add_argument('--rotate-once', action='store_true',
                        help='Perform single IP rotation and exit')
     parser.add_argument('--test-connectivity', action='store_true',
                        help='Test proxy connectivity and exit')
-    parser.add_argument('--execute', metavar='COMMAND',
-                       help='Execute command through proxy and exit')
+    parser.add_argument('--execute', metavar='COMMAND', action='append',
+                       help='Execute command through proxy and exit (repeat to run several concurrently)')
     parser.add_argument('--exclude-countries', metavar='CODES',
-                       help='Comma-separated country codes to exclude')
+                       help="Comma-separated country codes to exclude in addition to torrc's "
+                            "('reset' restores the torrc setting)")
+    parser.add_argument('--isolated-circuits', type=positive_int, metavar='N',
+                       help='Spread proxied connections over N isolated Tor circuits (default 1)')
     parser.add_argument('--verify-install', action='store_true',
                        help='Verify Tor installation and exit')
     parser.add_argument('--dns-test', action='store_true',
@@ -801,66 +1250,89 @@ Examples:
                        help='Generate operational report and exit')
     parser.add_argument('--version', action='version', version='TorShift v2.1.0')
     
-    args = parser.parse_args()
+    return parser
+
+def _parse_args(argv):
+    """Parse command-line arguments, short-circuiting the common one-shot flags"""
+    if len(argv) == 1 and argv[0] in _FAST_FLAGS:
+        args = types.SimpleNamespace(interactive=False, auto_rotate=None, rotate_once=False,
+                                     test_connectivity=False, execute=None, exclude_countries=None,
+                                     isolated_circuits=None,
+                                     verify_install=False, dns_test=False, generate_report=False)
+        setattr(args, argv[0][2:].replace('-', '_'), True)
+        return args
+    
+    return _build_parser().parse_args(argv)
+
+def _prelude(torshift, *, need_ip=False):
+    """Common start of one-shot commands: banner on a terminal, optionally the current IP"""
+    if sys.stdout.isatty():
+        torshift.banner()
+    if need_ip:
+        torshift.get_current_ip_address()
+
+def main():
+    """Main entry point for TorShift framework"""
+    args = _parse_args(sys.argv[1:])
 
     torshift = TorShift()
 
     if args.verify_install:
-        torshift.banner()
-        if torshift.verify_tor_installation():
-            print("[+] Tor installation verification: \033[92mPASS\033[0m")
+        _prelude(torshift)
+        if torshift.verify_tor_installation(use_persisted=False):
+            sys.stdout.write(_VERIFY_PASS)
         else:
-            print("[-] Tor installation verification: \033[91mFAIL\033[0m")
+            sys.stdout.write(_VERIFY_FAIL)
         return
     
-    if args.exclude_countries:
-        torshift.blocked_countries = [c.strip().upper() 
-                                    for c in args.exclude_countries.split(',')]
-
     if not torshift.initialize_tor_service():
         print("[-] Failed to initialize Tor service. Run setup_tor.sh first.")
         return
     
+    if args.exclude_countries:
+        if args.exclude_countries.strip().lower() == 'reset':
+            torshift.reset_blocked_countries()
+        else:
+            torshift.set_blocked_countries(args.exclude_countries)
+    
+    if args.isolated_circuits:
+        torshift.isolated_circuits = args.isolated_circuits
+    
     torshift.configure_proxychains()
     
     if args.interactive:
         torshift.interactive_mode()
     
     elif args.auto_rotate:
-        torshift.banner()
-        torshift.get_current_ip_address()
+        _prelude(torshift, need_ip=True)
         torshift.start_automatic_rotation(args.auto_rotate)
         
-        try:
-            while True:
-                time.sleep(10)
-        except KeyboardInterrupt:
-            torshift.stop_automatic_rotation()
+        # Block without polling until Ctrl-C or SIGTERM asks us to stop
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: torshift._shutdown.set())
+        torshift._shutdown.wait()
+        torshift.stop_automatic_rotation()
+        torshift._cleanup_session()
     
     elif args.rotate_once:
-        torshift.banner()
-        torshift.get_current_ip_address()
+        _prelude(torshift, need_ip=True)
         torshift.rotate_tor_circuit()
     
     elif args.test_connectivity:
-        torshift.banner()
+        _prelude(torshift)
         torshift.test_proxy_connectivity()
     
     elif args.execute:
-        torshift.banner()
-        stdout, stderr, exit_code = torshift.execute_through_proxy(args.execute)
-        if stdout:
-            print(stdout)
-        if stderr:
-            print(stderr, file=sys.stderr)
-        sys.exit(exit_code)
+        _prelude(torshift)
+        results = torshift.execute_many_through_proxy(args.execute, stream=True)
+        sys.exit(next((code for _, _, code in results if code), 0))
     
     elif args.dns_test:
-        torshift.banner()
+        _prelude(torshift)
         torshift.perform_dns_leak_test()
     
     elif args.generate_report:
-        torshift.banner()
+        _prelude(torshift)
         torshift.generate_operational_report()
     
     else: